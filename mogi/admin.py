@@ -1,5 +1,5 @@
-
 from django.contrib import admin
+from django.db.models import Count, Sum, Avg
 from .models import Track, Mogi, Race
 
 @admin.register(Track)
@@ -14,13 +14,35 @@ class RaceInline(admin.TabularInline):
 @admin.register(Mogi)
 class MogiAdmin(admin.ModelAdmin):
     list_display = ("id", "owner", "created_at", "finalized", "race_count", "total_points", "avg_finish", "note")
+    list_select_related = ("owner",)
     inlines = [RaceInline]
     ordering = ("owner", "created_at")
     list_filter = ("finalized", "owner")
 
+    def get_queryset(self, request):
+        # annotate once so the list columns don't each run their own query per row
+        return super().get_queryset(request).annotate(
+            _rc=Count("races"),
+            _tp=Sum("races__points"),
+            _af=Avg("races__position"),
+        )
+
+    @admin.display(description="Race count", ordering="_rc")
+    def race_count(self, obj):
+        return obj.race_count
+
+    @admin.display(description="Total points", ordering="_tp")
+    def total_points(self, obj):
+        return obj.total_points
+
+    @admin.display(description="Avg finish", ordering="_af")
+    def avg_finish(self, obj):
+        return obj.avg_finish
+
 @admin.register(Race)
 class RaceAdmin(admin.ModelAdmin):
     list_display = ("mogi", "index", "track", "position", "points")
+    list_select_related = ("mogi", "track", "mogi__owner")
     list_filter = ("track", "mogi__finalized", "mogi__owner")
     search_fields = ("track__name",)
     ordering = ("mogi__created_at", "index")
@@ -1,14 +1,21 @@
 
 import json
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.http import require_POST
 from django.db import transaction, models
 from django.contrib.auth.decorators import login_required
-from .models import Track, Mogi, Race, canonicalize_track, slug_for_track
+from .models import Track, Mogi, Race, default_points, canonicalize_track, slug_for_track, resolve_track_ids
 
 def _current_mogi(user):
-    m = Mogi.objects.filter(owner=user, finalized=False).order_by("created_at").first()
-    return m or Mogi.objects.create(owner=user)
+    # _rc (race count) and _mx (highest race index) come back with the mogi itself
+    m = (Mogi.objects.filter(owner=user, finalized=False)
+         .annotate(_rc=models.Count("races"), _mx=models.Max("races__index"))
+         .order_by("created_at").first())
+    if m is None:
+        m = Mogi.objects.create(owner=user)
+        m._rc, m._mx = 0, None
+    return m
 
 def _get_or_create_track(raw_name: str) -> Track:
     canon = canonicalize_track(raw_name)
@@ -29,7 +36,7 @@ def add_race(request):
 
     with transaction.atomic():
         mogi = _current_mogi(request.user)
-        next_index = (mogi.races.aggregate(mx=models.Max("index"))["mx"] or 0) + 1
+        next_index = (mogi._mx or 0) + 1
         if next_index > 12:
             return HttpResponseBadRequest("Mogi already has 12 races")
         track = _get_or_create_track(track_raw)
@@ -63,12 +70,30 @@ def finalize_current(request):
     mogi.save(update_fields=["finalized"])
     return JsonResponse({"ok": True, "mogi_id": mogi.id})
 
+def _json_array(rows):
+    """Yield a JSON array one row at a time."""
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + json.dumps(row, cls=DjangoJSONEncoder)
+    yield "]"
+
 @login_required
 def export_data(request):
-    user_mogis = list(Mogi.objects.filter(owner=request.user).values("id", "created_at", "finalized", "note"))
-    races = list(Race.objects.filter(mogi__owner=request.user).values("id", "mogi_id", "track_id", "index", "position", "points"))
-    tracks = list(Track.objects.values("id", "name", "slug"))
-    return JsonResponse({"tracks": tracks, "mogis": user_mogis, "races": races})
+    sections = {
+        "tracks": Track.objects.values("id", "name", "slug").iterator(chunk_size=1000),
+        "mogis": Mogi.objects.filter(owner=request.user).values("id", "created_at", "finalized", "note").iterator(chunk_size=2000),
+        "races": Race.objects.filter(mogi__owner=request.user).values("id", "mogi_id", "track_id", "index", "position", "points").iterator(chunk_size=2000),
+    }
+
+    # stream the payload instead of materializing every row before sending
+    def stream():
+        yield "{"
+        for i, (key, rows) in enumerate(sections.items()):
+            yield ("," if i else "") + json.dumps(key) + ":"
+            yield from _json_array(rows)
+        yield "}"
+
+    return StreamingHttpResponse(stream(), content_type="application/json")
 
 @login_required
 @require_POST
@@ -83,23 +108,27 @@ def import_data(request):
     races = payload.get("races", [])
 
     with transaction.atomic():
-        id_map_track = {}
-        for t in tracks:
-            canon = canonicalize_track(t["name"])
-            trk, _ = Track.objects.get_or_create(name=canon, defaults={"slug": slug_for_track(canon)})
-            id_map_track[t["id"]] = trk.id
-
-        id_map_mogi = {}
-        for m in mogis:
-            obj = Mogi.objects.create(owner=request.user, finalized=m["finalized"], note=m.get("note", ""))
-            id_map_mogi[m["id"]] = obj.id
-
-        for r in races:
-            Race.objects.create(
+        canons = {t["id"]: canonicalize_track(t["name"]) for t in tracks}
+        track_ids = resolve_track_ids(canons.values())
+        id_map_track = {tid: track_ids[canon] for tid, canon in canons.items()}
+
+        # bulk_create sets PKs on the returned objects (Postgres / SQLite 3.35+)
+        mogi_objs = Mogi.objects.bulk_create([
+            Mogi(owner=request.user, finalized=m["finalized"], note=m.get("note", ""))
+            for m in mogis
+        ])
+        id_map_mogi = {m["id"]: obj.id for m, obj in zip(mogis, mogi_objs)}
+
+        # bulk_create skips Race.save(), so apply the default points here
+        race_objs = [
+            Race(
                 mogi_id=id_map_mogi[r["mogi_id"]],
                 track_id=id_map_track[r["track_id"]],
                 index=r["index"],
                 position=r["position"],
-                points=r["points"],
+                points=r["points"] or default_points(r["position"]),
             )
+            for r in races
+        ]
+        Race.objects.bulk_create(race_objs, batch_size=1000)
     return JsonResponse({"ok": True})
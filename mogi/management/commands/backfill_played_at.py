@@ -1,4 +1,6 @@
+from itertools import groupby
 from django.core.management.base import BaseCommand
+from django.db import connection
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
@@ -13,17 +15,42 @@ class Command(BaseCommand):
         parser.add_argument("--username", help="Only backfill for this user (optional)")
 
     def handle(self, *args, **opts):
-        qs = Mogi.objects.all().order_by("id")
-        if opts.get("username"):
-            qs = qs.filter(owner__username=opts["username"])
         # space them 1 minute apart to guarantee strict ordering
-        count = 0
-        now = timezone.now()
-        for owner_id in qs.values_list("owner_id", flat=True).distinct():
-            rows = list(qs.filter(owner_id=owner_id))
-            base = now - timedelta(days=365)  # any stable base in the past
-            for i, m in enumerate(rows):
-                m.played_at = base + timedelta(minutes=i)
-            Mogi.objects.bulk_update(rows, ["played_at"])
-            count += len(rows)
+        base = timezone.now() - timedelta(days=365)  # any stable base in the past
+        if connection.vendor == "postgresql":
+            count = self.backfill_sql(base, opts.get("username"))
+        else:
+            count = self.backfill_orm(base, opts.get("username"))
         self.stdout.write(self.style.SUCCESS(f"Backfilled played_at on {count} mogis."))
+
+    def backfill_sql(self, base, username=None):
+        """Single UPDATE numbering each owner's mogis with ROW_NUMBER()."""
+        where, params = "", [base]
+        if username:
+            where = f"WHERE owner_id IN (SELECT id FROM {User._meta.db_table} WHERE username = %s)"
+            params.append(username)
+        sql = f"""
+            UPDATE {Mogi._meta.db_table} AS m
+            SET played_at = %s + (s.rn - 1) * interval '1 minute'
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY owner_id ORDER BY id) AS rn
+                FROM {Mogi._meta.db_table}
+                {where}
+            ) AS s
+            WHERE m.id = s.id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def backfill_orm(self, base, username=None):
+        """Portable path (SQLite): one SELECT, then batched bulk_update."""
+        qs = Mogi.objects.order_by("owner_id", "id").only("id", "owner_id", "played_at")
+        if username:
+            qs = qs.filter(owner__username=username)
+        rows = list(qs)
+        for _, owner_rows in groupby(rows, key=lambda m: m.owner_id):
+            for i, m in enumerate(owner_rows):
+                m.played_at = base + timedelta(minutes=i)
+        Mogi.objects.bulk_update(rows, ["played_at"], batch_size=10000)
+        return len(rows)
@@ -1,20 +1,26 @@
 import json
+import ijson
 from collections import defaultdict
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from mogi.models import Track, Mogi, Race, canonicalize_track, slug_for_track
+from mogi.models import Mogi, Race, default_points, canonicalize_track, resolve_track_ids
 
 User = get_user_model()
 
+# Keys that group a flat race list into mogis (instead of chunking by 12)
+FLAT_GROUP_KEYS = ("mogi_id", "mogi", "session_id", "session", "set", "group")
 
-def ensure_track_id(name: str) -> int:
-    """Canonicalize and upsert a Track; return its id."""
-    canon = canonicalize_track(name or "")
-    if not canon:
-        raise ValueError("Empty track name")
-    trk, _ = Track.objects.get_or_create(name=canon, defaults={"slug": slug_for_track(canon)})
-    return trk.id
+# Flat D/E imports are streamed and written in batches of this many mogis
+STREAM_BATCH_MOGIS = 100
+
+
+def canonical_track_or_none(name):
+    """Canonical track name, or None when the raw value can't be resolved to one."""
+    try:
+        return canonicalize_track(name or "") or None
+    except Exception:
+        return None
 
 
 class Command(BaseCommand):
@@ -27,7 +33,8 @@ class Command(BaseCommand):
         "  D) {'history': [ {'track':str, 'position':int, 'index'?:int, ...}, ... ]}\n"
         "  E) A flat list of races: [ {'track':str, 'position':int, 'index'?:int, ...}, ... ]\n"
         "\n"
-        "For D/E (flat race history), races are chunked into mogis of 12 (in order)."
+        "For D/E (flat race history), races are chunked into mogis of 12 (in order).\n"
+        "Ungrouped D/E files are streamed, so their size isn't limited by memory."
     )
 
     def add_arguments(self, parser):
@@ -42,7 +49,11 @@ class Command(BaseCommand):
 
     def parse_format_A(self, data):
         """tracks/mogis/races with numeric id references."""
-        tracks = {t["id"]: ensure_track_id(t.get("name", "")) for t in data.get("tracks", [])}
+        canons = {t["id"]: canonicalize_track(t.get("name") or "") for t in data.get("tracks", [])}
+        if not all(canons.values()):
+            raise ValueError("Empty track name")
+        track_ids = resolve_track_ids(set(canons.values()))
+        tracks = {tid: track_ids[canon] for tid, canon in canons.items()}
         mogis_in = data.get("mogis", [])
         races_in = data.get("races", [])
         mogis_out = [{"finalized": m.get("finalized", False), "note": m.get("note", ""), "races": []}
@@ -84,7 +95,7 @@ class Command(BaseCommand):
         """
         # Try grouping by any obvious grouping key
         group_key = None
-        for key in ("mogi_id", "mogi", "session_id", "session", "set", "group"):
+        for key in FLAT_GROUP_KEYS:
             if any(isinstance(r, dict) and key in r for r in races):
                 group_key = key
                 break
@@ -113,6 +124,107 @@ class Command(BaseCommand):
             mogis.append({"finalized": len(norm) == 12, "note": "", "races": norm})
         return mogis
 
+    # -------------- Streaming (flat D/E) --------------
+
+    def detect_flat_stream(self, path):
+        """
+        Scan the file with ijson (constant memory) and return (prefix, race_count)
+        when it is an ungrouped flat race list (D: 'history.item', E: 'item'),
+        otherwise None. Grouped lists need every race in memory to build the
+        groups, so they go through the regular parser.
+        """
+        top_keys, arrays, grouped = set(), set(), set()
+        items = {"item": 0, "history.item": 0}
+        first_keys = {"item": set(), "history.item": set()}
+        with open(path, "rb") as f:
+            for prefix, event, value in ijson.parse(f):
+                if event == "map_key" and prefix == "":
+                    top_keys.add(value)
+                elif event == "start_array" and prefix in ("", "history", "mogis"):
+                    arrays.add(prefix)
+                elif event == "start_map" and prefix in items:
+                    items[prefix] += 1
+                elif event == "map_key" and prefix in items:
+                    if items[prefix] == 1:
+                        first_keys[prefix].add(value)
+                    if value in FLAT_GROUP_KEYS:
+                        grouped.add(prefix)
+
+        # same precedence as the shape detection in handle()
+        if "" in arrays:
+            keys = first_keys["item"]
+            prefix = "item" if "track" in keys and "races" not in keys else None
+        elif {"tracks", "mogis", "races"} <= top_keys or "mogis" in arrays:
+            prefix = None
+        else:
+            prefix = "history.item" if "history" in arrays else None
+
+        if prefix is None or prefix in grouped:
+            return None
+        return prefix, items[prefix]
+
+    def stream_flat_races(self, path, prefix):
+        """Yield normalized mogi blocks, 12 races at a time, without loading the file."""
+        with open(path, "rb") as f:
+            chunk = []
+            for r in ijson.items(f, prefix, use_float=True):
+                chunk.append(r)
+                if len(chunk) == 12:
+                    yield from self.parse_flat_races(chunk)
+                    chunk = []
+            if chunk:
+                yield from self.parse_flat_races(chunk)
+
+    # -------------- Import --------------
+
+    def import_mogi_blocks(self, user, mogi_blocks, track_ids):
+        """
+        Bulk-insert mogis and their races; returns (mogis, races) imported.
+        track_ids caches canonical name -> Track id across calls.
+        """
+        mogi_objs = Mogi.objects.bulk_create([
+            Mogi(owner=user, finalized=m.get("finalized", False), note=m.get("note", ""))
+            for m in mogi_blocks
+        ])
+
+        # Resolve every distinct track name once instead of a get_or_create per race
+        needed = {
+            canonical_track_or_none(r.get("track"))
+            for m in mogi_blocks for r in m.get("races", [])
+        } - {None} - track_ids.keys()
+        track_ids.update(resolve_track_ids(needed))
+
+        all_races = []
+        for obj, m in zip(mogi_objs, mogi_blocks):
+            for i, r in enumerate(m.get("races", []), start=1):
+                track_id = track_ids.get(canonical_track_or_none(r.get("track")))
+                if track_id is None:
+                    # Skip races without a resolvable track name
+                    continue
+                idx = r.get("index") or i
+                pos = int(r.get("position") or r.get("finish") or r.get("place") or 12)
+                # bulk_create skips Race.save(), so apply the default points here
+                pts = int(r.get("points") or 0) or default_points(pos)
+                all_races.append(Race(mogi=obj, track_id=track_id, index=idx, position=pos, points=pts))
+        Race.objects.bulk_create(all_races, batch_size=1000)
+        return len(mogi_objs), len(all_races)
+
+    def import_stream(self, user, path, prefix):
+        """Import a streamed flat race list in batches of STREAM_BATCH_MOGIS mogis."""
+        imported_mogis = imported_races = 0
+        track_ids = {}
+        batch = []
+        with transaction.atomic():
+            for block in self.stream_flat_races(path, prefix):
+                batch.append(block)
+                if len(batch) == STREAM_BATCH_MOGIS:
+                    n_mogis, n_races = self.import_mogi_blocks(user, batch, track_ids)
+                    imported_mogis += n_mogis
+                    imported_races += n_races
+                    batch = []
+            n_mogis, n_races = self.import_mogi_blocks(user, batch, track_ids)
+        return imported_mogis + n_mogis, imported_races + n_races
+
     # -------------- Command handler --------------
 
     def handle(self, *args, **opts):
@@ -125,6 +237,32 @@ class Command(BaseCommand):
         except User.DoesNotExist:
             raise CommandError(f"User '{username}' not found. Create/sign up user first.")
 
+        try:
+            stream = self.detect_flat_stream(path)
+        except Exception as e:
+            raise CommandError(f"Failed reading JSON: {e}")
+
+        if stream:
+            prefix, total_races = stream
+            fmt = "E"
+            self.stdout.write(
+                f"Detected format {fmt}. Found {-(-total_races // 12)} mogis, {total_races} races (streaming)."
+            )
+            if dry_run:
+                first = next(self.stream_flat_races(path, prefix), {})
+                self.stdout.write(self.style.WARNING(
+                    f"[DRY-RUN] Example mogi: finalized={first.get('finalized')}, races={len(first.get('races', []))}"
+                ))
+                return
+            try:
+                imported_mogis, imported_races = self.import_stream(user, path, prefix)
+            except ijson.JSONError as e:
+                raise CommandError(f"Failed reading JSON: {e}")
+            self.stdout.write(self.style.SUCCESS(
+                f"Imported {imported_mogis} mogis and {imported_races} races for user '{username}' (format {fmt})."
+            ))
+            return
+
         try:
             with open(path, "r", encoding="utf-8") as f:
                 data = json.load(f)
@@ -172,24 +310,8 @@ class Command(BaseCommand):
             return
 
         # Import
-        imported_mogis = 0
-        imported_races = 0
         with transaction.atomic():
-            for m in mogi_blocks:
-                obj = Mogi.objects.create(owner=user, finalized=m.get("finalized", False), note=m.get("note", ""))
-                imported_mogis += 1
-                for i, r in enumerate(m.get("races", []), start=1):
-                    track_name = r.get("track")
-                    try:
-                        track_id = ensure_track_id(track_name)
-                    except Exception:
-                        # Skip races without a resolvable track name
-                        continue
-                    idx = r.get("index") or i
-                    pos = int(r.get("position") or r.get("finish") or r.get("place") or 12)
-                    pts = int(r.get("points") or 0)
-                    Race.objects.create(mogi=obj, track_id=track_id, index=idx, position=pos, points=pts)
-                    imported_races += 1
+            imported_mogis, imported_races = self.import_mogi_blocks(user, mogi_blocks, {})
 
         self.stdout.write(self.style.SUCCESS(
             f"Imported {imported_mogis} mogis and {imported_races} races for user '{username}' (format {fmt})."
@@ -1,4 +1,5 @@
 
+from collections import defaultdict
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from mogi.models import Track, Race, canonicalize_track, slug_for_track
@@ -9,15 +10,24 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         with transaction.atomic():
             canon_map = {}
+            changed = []
+            dups_by_target = defaultdict(list)
             for tr in Track.objects.all():
                 canon = canonicalize_track(tr.name)
                 if canon not in canon_map:
-                    tr.name = canon
-                    tr.slug = slug_for_track(canon)
-                    tr.save(update_fields=["name", "slug"])
+                    slug = slug_for_track(canon)
+                    if (tr.name, tr.slug) != (canon, slug):
+                        tr.name = canon
+                        tr.slug = slug
+                        changed.append(tr)
                     canon_map[canon] = tr
                 else:
-                    target = canon_map[canon]
-                    Race.objects.filter(track=tr).update(track=target)
-                    tr.delete()
+                    dups_by_target[canon_map[canon].id].append(tr.id)
+
+            # one UPDATE per canonical track, then one DELETE for all duplicates
+            for target_id, dup_ids in dups_by_target.items():
+                Race.objects.filter(track_id__in=dup_ids).update(track_id=target_id)
+            Track.objects.filter(id__in=[d for dups in dups_by_target.values() for d in dups]).delete()
+            # rename after the duplicates are gone so unique name/slug can't collide
+            Track.objects.bulk_update(changed, ["name", "slug"])
         self.stdout.write(self.style.SUCCESS("Tracks canonicalized and duplicates merged."))
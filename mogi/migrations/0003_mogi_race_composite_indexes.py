@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-15 22:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mogi', '0002_mogi_played_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mogi',
+            index=models.Index(fields=['owner', 'finalized', 'created_at'], name='mogi_mogi_owner_i_f30897_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='race',
+            index=models.Index(fields=['mogi', 'track'], name='mogi_race_mogi_id_a2d90f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='race',
+            index=models.Index(fields=['track', 'mogi'], name='mogi_race_track_i_33d609_idx'),
+        ),
+    ]
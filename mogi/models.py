@@ -1,8 +1,12 @@
+import functools
+import re
+
 from django.utils import timezone
 
 from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
+from django.utils.functional import cached_property
 from django.contrib.auth.models import User
 
 # ---------- Canonicalization ----------
@@ -22,15 +26,35 @@ CANON_MAP = {
     "bc": "bowser's castle",
 }
 
+_WS_RE = re.compile(r"\s+")
+_APOSTROPHES = str.maketrans({"’": "'"})
+
+# pure functions of a small set of repeated names; cached for the import paths
+@functools.lru_cache(maxsize=1024)
 def canonicalize_track(raw: str) -> str:
     if not raw:
         return ""
-    name = " ".join(raw.strip().lower().replace("’", "'").split())
+    name = _WS_RE.sub(" ", raw.translate(_APOSTROPHES).strip().lower())
     return CANON_MAP.get(name, name)
 
+@functools.lru_cache(maxsize=1024)
 def slug_for_track(canon_name: str) -> str:
     return slugify(canon_name)
 
+def resolve_track_ids(canon_names) -> dict:
+    """Upsert Tracks for a set of canonical names in bulk; return {name: id}."""
+    names = set(canon_names)
+    ids = dict(Track.objects.filter(name__in=names).values_list("name", "id"))
+    missing = names - ids.keys()
+    if missing:
+        # a concurrent import or add_race may insert the same track first;
+        # skip those rows and re-read the ids instead of failing the import
+        Track.objects.bulk_create(
+            [Track(name=c, slug=slug_for_track(c)) for c in missing], ignore_conflicts=True
+        )
+        ids.update(Track.objects.filter(name__in=missing).values_list("name", "id"))
+    return ids
+
 # ---------- Models ----------
 
 class Track(models.Model):
@@ -41,23 +65,44 @@ class Track(models.Model):
     class Meta:
         ordering = ["name"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs):
         canon = canonicalize_track(self.name)
+        new_slug = slug_for_track(canon)
+        self.__dict__.pop("display_name", None)  # name may have changed
+        loaded = getattr(self, "_loaded_values", {})
+        if not self._state.adding and loaded.get("name") == canon and loaded.get("slug") == new_slug:
+            # already canonical in the DB; skip the no-op UPDATE
+            self.name, self.slug = canon, new_slug
+            return
         self.name = canon
-        self.slug = slug_for_track(canon)
+        self.slug = new_slug
         super().save(*args, **kwargs)
+        self._loaded_values = {"id": self.pk, "name": canon, "slug": new_slug}
 
+    @cached_property
     def display_name(self) -> str:
         dn = self.name.title().replace("'S ", "'s ").replace("S' ", "s' ")
         return dn
 
     def __str__(self):
-        return self.display_name()
+        return self.display_name
 
-DEFAULT_POINTS = {
-    1: 15, 2: 12, 3: 10, 4: 9, 5: 8, 6: 7,
-    7: 6, 8: 5, 9: 4, 10: 3, 11: 2, 12: 1
-}
+# indexed by finishing position 1..12 (index 0 unused)
+DEFAULT_POINTS = (0, 15, 12, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1)
+
+def default_points(position) -> int:
+    """Points for a finishing position; 0 if it isn't a number in 1..12."""
+    try:
+        position = int(position)
+    except (TypeError, ValueError):
+        return 0
+    return DEFAULT_POINTS[position] if 1 <= position <= 12 else 0
 
 class Mogi(models.Model):
     owner = models.ForeignKey(User, related_name="mogis", on_delete=models.CASCADE)
@@ -70,10 +115,18 @@ class Mogi(models.Model):
 
     class Meta:
         ordering = ["created_at"]
-        indexes = [models.Index(fields=["owner", "created_at"])]
+        indexes = [
+            models.Index(fields=["owner", "created_at"]),
+            models.Index(fields=["owner", "finalized", "created_at"]),
+        ]
+
+    # Querysets can annotate _rc / _tp / _af (race count, total points, avg finish);
+    # the properties below use those when present instead of querying again.
 
     @property
     def race_count(self) -> int:
+        if hasattr(self, "_rc"):
+            return self._rc
         return self.races.count()
 
     @property
@@ -82,12 +135,17 @@ class Mogi(models.Model):
 
     @property
     def total_points(self) -> int:
-        return sum(r.points for r in self.races.all())
+        if hasattr(self, "_tp"):
+            return self._tp or 0
+        return self.races.aggregate(s=models.Sum("points"))["s"] or 0
 
     @property
     def avg_finish(self) -> float:
-        qs = self.races.all()
-        return round(sum(r.position for r in qs) / qs.count(), 2) if qs.exists() else 0.0
+        if hasattr(self, "_af"):
+            avg = self._af
+        else:
+            avg = self.races.aggregate(avg=models.Avg("position"))["avg"]
+        return round(avg, 2) if avg is not None else 0.0
 
     def __str__(self):
         return f"Mogi ({self.created_at:%Y-%m-%d %H:%M})"
@@ -109,10 +167,15 @@ class Race(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["mogi", "index"], name="unique_race_index_per_mogi")
         ]
+        # (mogi, index) is already covered by the unique constraint above
+        indexes = [
+            models.Index(fields=["mogi", "track"]),
+            models.Index(fields=["track", "mogi"]),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.points:
-            self.points = DEFAULT_POINTS.get(self.position, 0)
+            self.points = default_points(self.position)
         super().save(*args, **kwargs)
 
     @property
@@ -126,4 +189,4 @@ class Race(models.Model):
 
 
     def __str__(self):
-        return f"{self.mogi_id} • {self.track.display_name()} • #{self.index} • P{self.position}"
+        return f"{self.mogi_id} • {self.track.display_name} • #{self.index} • P{self.position}"
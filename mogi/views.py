@@ -1,15 +1,13 @@
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import HttpResponse
-from django.db.models import Count, Avg, Sum, Q, Min, Max
+from django.core.paginator import Paginator
+from django.db.models import Count, Avg, Sum, Q, Min, Max, Prefetch
 from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from .forms import SignUpForm
 from .models import Track, Mogi, Race
-from django.contrib.auth.forms import UserCreationForm
-from django.contrib.auth import login as auth_login
-from django.shortcuts import render, redirect
 
 
 
@@ -38,16 +36,23 @@ def _current_mogi_points(user):
         return 0
     return Race.objects.filter(mogi=m).aggregate(t=Sum('points'))['t'] or 0
 
-def _mogi_numbering_map(user):
-    ids_oldest_first = list(
-        Mogi.objects.filter(owner=user, finalized=True)
-        .order_by("created_at")
-        .values_list("id", flat=True)
-    )
-    return {mid: i + 1 for i, mid in enumerate(ids_oldest_first)}
+def _mogi_numbering_map(request):
+    # memoized on the request so repeat calls during one render don't re-query
+    cached = getattr(request, "_mogi_numbering_map", None)
+    if cached is None:
+        ids_oldest_first = (
+            Mogi.objects.filter(owner=request.user, finalized=True)
+            .order_by("created_at")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=2000)
+        )
+        cached = request._mogi_numbering_map = {mid: i for i, mid in enumerate(ids_oldest_first, start=1)}
+    return cached
 
 def _sorted_mogis(user, sort: str):
-    qs = Mogi.objects.filter(owner=user, finalized=True)
+    qs = (Mogi.objects.filter(owner=user, finalized=True)
+          .annotate(_tp=Sum("races__points"), _af=Avg("races__position"))
+          .prefetch_related(Prefetch("races", queryset=Race.objects.select_related("track").order_by("index"))))
     return qs.order_by("created_at") if sort == "oldest" else qs.order_by("-created_at")
 
 # ---------- Pages ----------
@@ -56,13 +61,14 @@ def _sorted_mogis(user, sort: str):
 def dashboard(request):
     mogi = _current_mogi(request.user)
     completed = _sorted_mogis(request.user, sort="newest")
-    numbering_map = _mogi_numbering_map(request.user)
+    numbering_map = _mogi_numbering_map(request)
 
+    mine = Q(races__mogi__owner=request.user)
     track_perf = (
         Track.objects
         .annotate(
-            times=Count("races"),
-            avg_finish=Avg("races__position"),
+            times=Count("races", filter=mine),
+            avg_finish=Avg("races__position", filter=mine),
         )
         .filter(times__gt=0)
         .order_by("avg_finish", "name")[:10]  # Top 10 best avg first
@@ -87,7 +93,7 @@ def dashboard(request):
 @login_required
 def mogi_list(request):
     mogis = _sorted_mogis(request.user, "newest")
-    numbering_map = _mogi_numbering_map(request.user)
+    numbering_map = _mogi_numbering_map(request)
     return render(request, "mogi/mogi_list.html", {
         "mogis": mogis,
         "numbering_map": numbering_map,
@@ -96,7 +102,10 @@ def mogi_list(request):
 
 @login_required
 def mogi_detail(request, mogi_id: int):
-    mogi = get_object_or_404(Mogi, id=mogi_id, owner=request.user)
+    mogi = get_object_or_404(
+        Mogi.objects.annotate(_rc=Count("races"), _tp=Sum("races__points"), _af=Avg("races__position")),
+        id=mogi_id, owner=request.user,
+    )
     races = mogi.races.select_related("track").order_by("index")
     return render(request, "mogi/mogi_detail.html", {"mogi": mogi, "races": races})
 
@@ -110,6 +119,7 @@ def track_detail(request, slug):
     track = get_object_or_404(Track, slug=slug)
     races = Race.objects.filter(track=track, mogi__owner=request.user).select_related("mogi").order_by("-mogi__played_at")
 
+    # stats plus the 1–12 finish distribution (p1..p12) in one aggregate query
     stats = races.aggregate(
         times=Count("id"),
         avg_finish=Avg("position"),
@@ -117,13 +127,9 @@ def track_detail(request, slug):
         worst=Max("position"),
         total_points=Sum("points"),
         avg_points=Avg("points"),
+        **{f"p{i}": Count("id", filter=Q(position=i)) for i in range(1, 13)},
     )
-
-    # distribution: count by position 1–12
-    distribution = races.values("position").annotate(count=Count("id")).order_by("position")
-    dist_map = {d["position"]: d["count"] for d in distribution}
-    # fill missing positions with 0
-    finish_dist = [(i, dist_map.get(i, 0)) for i in range(1, 13)]
+    finish_dist = [(i, stats[f"p{i}"]) for i in range(1, 13)]
 
     return render(request, "mogi/track_detail.html", {
         "track": track,
@@ -135,7 +141,8 @@ def track_detail(request, slug):
 @login_required
 def race_history(request):
     races = Race.objects.select_related("mogi", "track").filter(mogi__owner=request.user).order_by("-mogi__created_at", "-index")
-    return render(request, "mogi/history.html", {"races": races})
+    page = Paginator(races, 200).get_page(request.GET.get("page"))
+    return render(request, "mogi/history.html", {"races": page, "page": page})
 
 @login_required
 def all_time_stats(request):
@@ -168,7 +175,7 @@ def all_time_stats(request):
 @login_required
 def mogi_cards_fragment(request):
     sort = request.GET.get("sort", "newest")
-    numbering_map = _mogi_numbering_map(request.user)
+    numbering_map = _mogi_numbering_map(request)
     mogis = _sorted_mogis(request.user, sort)
     html = render_to_string("mogi/includes/mogi_cards.html", {
         "mogis": mogis,
@@ -179,7 +186,7 @@ def mogi_cards_fragment(request):
 @login_required
 def dashboard_cards_fragment(request):
     sort = request.GET.get("sort", "newest")
-    numbering_map = _mogi_numbering_map(request.user)
+    numbering_map = _mogi_numbering_map(request)
     mogis = _sorted_mogis(request.user, sort)
     html = render_to_string("mogi/includes/dashboard_cards.html", {
         "completed": mogis,
@@ -187,17 +194,6 @@ def dashboard_cards_fragment(request):
     }, request=request)
     return HttpResponse(html)
 
-def signup(request):
-    if request.method == "POST":
-        form = UserCreationForm(request.POST)
-        if form.is_valid():
-            user = form.save()
-            auth_login(request, user)
-            return redirect("mogi:dashboard")
-    else:
-        form = UserCreationForm()
-    return render(request, "registration/signup.html", {"form": form})
-
 
 
 def running_totals(mogi_id):